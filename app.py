@@ -1,11 +1,17 @@
 
 from flask import Flask, render_template, request
+from functools import lru_cache
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
 from io import BytesIO
 import base64
 
+import historial
+
 app = Flask(__name__)
+app.register_blueprint(historial.rutas)
 
 # Datos de la tabla de poleas (para 4 canales)
 poleas_estandares = {
@@ -23,6 +29,9 @@ tabla_capacidad_5V = {
     2000: 26.5
 }
 
+# RPM de la tabla ordenadas una sola vez (se reutilizan en cada interpolación)
+rpm_ordenadas_5V = sorted(tabla_capacidad_5V.keys())
+
 # Curva de la bomba (datos del manual)
 curva_base = {
     'rpm': 2020,
@@ -62,7 +71,7 @@ def calcular():
     
     # 5. Calcular capacidad de la correa
     # Interpolación para RPM del motor
-    rpm_ordenadas = sorted(tabla_capacidad_5V.keys())
+    rpm_ordenadas = rpm_ordenadas_5V
     for i in range(len(rpm_ordenadas)-1):
         if rpm_ordenadas[i] <= rpm_motor <= rpm_ordenadas[i+1]:
             rpm1 = rpm_ordenadas[i]
@@ -86,20 +95,30 @@ def calcular():
     L = 2*C + (np.pi/2)*(D + d) + ((D - d)**2)/(4*C)
     L = round(L, 2)
     
-    # Generar gráfica
-    plot_url = generar_grafica(rpm_bomba, rpm_motor)
-    
-    return {
+    resultados = {
         'diam_bomba': diam_bomba_std,
         'canales_bomba': canales_motor,
         'tipo_correa': '5V',
         'longitud': L,
         'factor_seguridad': factor_seguridad,
         'capacidad_total': round(capacidad_total, 1),
-        'hp_diseno': round(hp_diseno, 1),
-        'plot_url': plot_url
+        'hp_diseno': round(hp_diseno, 1)
     }
+    
+    # Guardar en el historial (escritura diferida, no bloquea la respuesta)
+    if not app.config.get('HISTORIAL_DESACTIVADO'):
+        historial.registrar('raiz', request.form.to_dict(), resultados,
+                            hp=hp_motor, rpm_motor=rpm_motor, rpm_bomba=rpm_bomba,
+                            d_motora=diam_motor, d_bomba=diam_bomba_std,
+                            longitud=L, factor_seguridad=factor_seguridad)
+    
+    # Generar gráfica
+    plot_url = generar_grafica(rpm_bomba, rpm_motor)
+    
+    return {**resultados, 'plot_url': plot_url}
 
+# La gráfica solo depende de las dos RPM: se reutiliza entre peticiones
+@lru_cache(maxsize=64)
 def generar_grafica(rpm_operacion, rpm_motor):
     # Datos de la curva base (2020 RPM)
     q_base = curva_base['q']
@@ -120,7 +139,7 @@ def generar_grafica(rpm_operacion, rpm_motor):
     # Graficar curvas para diferentes RPM
     plt.plot(q_range, h_2000, 'b-', label=f'2000 RPM', linewidth=2)
     plt.plot(q_range, h_1600, 'r-', label=f'1600 RPM (Operación)', linewidth=2)
-    plt.plot(q_range, h_operacion, 'g--', label=f'{rpm_operacion} RPM (Actual)', linewidth=2)
+    plt.plot(q_range, h_operacion, 'g--', label=f'{rpm_operacion:g} RPM (Actual)', linewidth=2)
     
     # Punto de operación
     q_op = q_base * (rpm_operacion/2020)
@@ -135,8 +154,8 @@ def generar_grafica(rpm_operacion, rpm_motor):
     plt.legend(fontsize=10)
     
     # Añadir anotaciones
-    plt.annotate(f'RPM Motor: {rpm_motor}', xy=(10, 10), xycoords='axes pixels', fontsize=10)
-    plt.annotate(f'RPM Bomba: {rpm_operacion}', xy=(10, 30), xycoords='axes pixels', fontsize=10)
+    plt.annotate(f'RPM Motor: {rpm_motor:g}', xy=(10, 10), xycoords='axes pixels', fontsize=10)
+    plt.annotate(f'RPM Bomba: {rpm_operacion:g}', xy=(10, 30), xycoords='axes pixels', fontsize=10)
     plt.annotate(f'Caudal: {q_op:.1f} m³/hr', xy=(10, 50), xycoords='axes pixels', fontsize=10)
     plt.annotate(f'Altura: {h_op:.1f} m', xy=(10, 70), xycoords='axes pixels', fontsize=10)
     
@@ -151,5 +170,20 @@ def generar_grafica(rpm_operacion, rpm_motor):
     
     return f"data:image/png;base64,{img_data}"
 
+# Petición de referencia usada por servidor.py para medir la primera respuesta
+PETICION_EJEMPLO = ('/calcular', {
+    'rpm_motor': 1800,
+    'hp_motor': 75,
+    'rpm_bomba': 1600,
+    'centro_dist': 620,
+    'diam_motor': 8.95,
+    'canales_motor': 4
+})
+
+def precalentar():
+    # La gráfica del punto de ejemplo carga las fuentes, deja listo el backend
+    # Agg y queda en caché antes de que servidor.py cree los workers con fork()
+    generar_grafica(PETICION_EJEMPLO[1]['rpm_bomba'], PETICION_EJEMPLO[1]['rpm_motor'])
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -1,11 +1,17 @@
 
 from flask import Flask, render_template, request
+from functools import lru_cache
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
 from io import BytesIO
 import base64
 
+import historial
+
 app = Flask(__name__)
+app.register_blueprint(historial.rutas)
 
 # Datos de la tabla de poleas (para 4 canales)
 poleas_estandares = {
@@ -23,6 +29,9 @@ tabla_capacidad_5V = {
     2000: 26.5
 }
 
+# RPM de la tabla ordenadas una sola vez (se reutilizan en cada interpolación)
+rpm_ordenadas_5V = sorted(tabla_capacidad_5V.keys())
+
 # Curva de la bomba (datos del manual)
 curva_base = {
     'rpm': 2020,
@@ -52,7 +61,7 @@ def calcular():
     diam_bomba = round(diam_bomba, 2)
     std_diam = min(poleas_estandares[canales_motor], key=lambda x: abs(x - diam_bomba))
     diam_bomba_std = std_diam if abs(std_diam - diam_bomba) < 1 else diam_bomba
-    rpm_ordenadas = sorted(tabla_capacidad_5V.keys())
+    rpm_ordenadas = rpm_ordenadas_5V
     for i in range(len(rpm_ordenadas)-1):
         if rpm_ordenadas[i] <= rpm_motor <= rpm_ordenadas[i+1]:
             rpm1 = rpm_ordenadas[i]
@@ -70,6 +79,17 @@ def calcular():
     d = diam_bomba_std
     L = 2*C + (np.pi/2)*(D + d) + ((D - d)**2)/(4*C)
     L = round(L, 2)
+    if not app.config.get('HISTORIAL_DESACTIVADO'):
+        historial.registrar('app', request.form.to_dict(), {
+            'diam_bomba': diam_bomba_std,
+            'canales_bomba': canales_motor,
+            'tipo_correa': '5V',
+            'longitud': L,
+            'factor_seguridad': factor_seguridad,
+            'capacidad_total': round(capacidad_total, 1),
+            'hp_diseno': round(hp_diseno, 1)
+        }, hp=hp_motor, rpm_motor=rpm_motor, rpm_bomba=rpm_bomba, d_motora=diam_motor,
+            d_bomba=diam_bomba_std, longitud=L, factor_seguridad=factor_seguridad)
     plot_url = generar_grafica(rpm_bomba, rpm_motor)
     return render_template('index.html',
         diam_bomba=diam_bomba_std,
@@ -82,18 +102,30 @@ def calcular():
         plot_url=plot_url
     )
 
-def generar_grafica(rpm_operacion, rpm_motor):
-    # --- 1. Generar una curva base realista ---
+
+@lru_cache(maxsize=None)
+def ajustar_curva_base():
+    # Curva base realista ajustada al punto del manual; no depende de la
+    # petición, así que se calcula una sola vez por proceso
     q_base = curva_base['q']
     h_base = curva_base['h']
-    rpm_base = curva_base['rpm']
-    
+
     q_max_base = q_base * 1.8
     h_max_base = h_base / (1 - (q_base**2 / q_max_base**2)) if (1 - (q_base**2 / q_max_base**2)) != 0 else h_base * 1.2
     k_base = h_max_base / (q_max_base**2)
 
     q_range_base = np.linspace(0, q_max_base, 100)
     h_range_base = h_max_base - k_base * q_range_base**2
+    return q_range_base, h_range_base
+
+# La gráfica solo depende de las dos RPM: se reutiliza entre peticiones
+@lru_cache(maxsize=64)
+def generar_grafica(rpm_operacion, rpm_motor):
+    # --- 1. Generar una curva base realista ---
+    q_base = curva_base['q']
+    h_base = curva_base['h']
+    rpm_base = curva_base['rpm']
+    q_range_base, h_range_base = ajustar_curva_base()
 
     # --- 2. Aplicar Leyes de Afinidad para escalar la curva ---
     def escalar_curva(rpm_nueva):
@@ -137,5 +169,24 @@ def generar_grafica(rpm_operacion, rpm_motor):
     
     return f"data:image/png;base64,{img_data}"
 
+
+# Petición de referencia usada por servidor.py para medir la primera respuesta
+PETICION_EJEMPLO = ('/calcular', {
+    'rpm_motor': 1800,
+    'hp_motor': 75,
+    'rpm_bomba': 1600,
+    'centro_dist': 620,
+    'diam_motor': 8.95,
+    'canales_motor': 4
+})
+
+
+def precalentar():
+    # Ajusta la curva base y renderiza la gráfica del punto de ejemplo
+    # (fuentes, backend Agg), que queda en caché antes de que servidor.py cree
+    # los workers con fork()
+    ajustar_curva_base()
+    generar_grafica(PETICION_EJEMPLO[1]['rpm_bomba'], PETICION_EJEMPLO[1]['rpm_motor'])
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
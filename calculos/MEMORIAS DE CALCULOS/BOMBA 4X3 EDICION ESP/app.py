@@ -6,117 +6,152 @@
 #
 # Para ejecutar esta aplicación:
 # 1. Asegúrate de tener Python instalado.
-# 2. Instala las librerías necesarias:
-#    pip install Flask matplotlib
-# 3. Guarda este código como "app.py".
-# 4. Ejecuta desde la terminal: python app.py
-# 5. Abre tu navegador web y ve a http://127.0.0.1:5000
+# 2. Desde la raíz del repositorio, instala las librerías necesarias y el
+#    módulo compartido historial.py:
+#    pip install -e .
+# 3. Ejecuta desde la carpeta de esta aplicación: python app.py
+# 4. Abre tu navegador web y ve a http://127.0.0.1:5000
 # -----------------------------------------------------------------------------
 
 import math
 import io
 import base64
-from flask import Flask, render_template, request
+import json
+import time
+from flask import Flask, Response, render_template, request
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
 
+import historial
+from grafo_calculo import GrafoCalculo
+
 # Inicializar la aplicación Flask
 app = Flask(__name__)
+app.register_blueprint(historial.rutas)
 
 # --- Funciones de Cálculo de Ingeniería ---
 
-def calcular_diseno_correa(potencia_hp, rpm_motor, rpm_bomba, d_motora, C_mm):
-    """
-    Realiza los cálculos de diseño para la transmisión por correa en V.
-    """
-    resultados = {}
+# Las etapas del diseño forman un grafo de dependencias (grafo_calculo.py):
+# al cambiar una entrada solo se recalculan las etapas que dependen de ella.
+grafo = GrafoCalculo(entradas=('potencia_hp', 'rpm_motor', 'rpm_bomba', 'd_motora', 'C_mm'))
 
-    # --- 1. Conversión de Unidades y Datos Iniciales ---
-    C = C_mm / 25.4  # Convertir distancia entre centros de mm a pulgadas
-    resultados['C_in'] = C
+# Claves que se muestran como resultado del diseño
+CLAVES_RESULTADOS = ('C_in', 'd_bomba', 'longitud_correa', 'C_real', 'angulo_contacto',
+                     'potencia_diseno', 'potencia_corregida', 'num_correas', 'factor_seguridad')
 
-    # --- 2. Diámetro de la Polea Conducida (Bomba) ---
-    d_bomba = (rpm_motor / rpm_bomba) * d_motora
-    resultados['d_bomba'] = d_bomba
+# --- 1. Conversión de Unidades y Datos Iniciales ---
+@grafo.etapa('C_in', depende_de=('C_mm',))
+def calcular_C_in(C_mm):
+    return C_mm / 25.4  # Convertir distancia entre centros de mm a pulgadas
 
-    # --- 3. Longitud de la Correa (Fórmula de Mott, Cap. 7) ---
-    # L ≈ 2C + 1.57(D₂ + D₁) + (D₂ - D₁)² / 4C
-    L = 2 * C + 1.57 * (d_bomba + d_motora) + (d_bomba - d_motora)**2 / (4 * C)
-    
+# --- 2. Diámetro de la Polea Conducida (Bomba) ---
+@grafo.etapa('d_bomba', depende_de=('rpm_motor', 'rpm_bomba', 'd_motora'))
+def calcular_d_bomba(rpm_motor, rpm_bomba, d_motora):
+    return (rpm_motor / rpm_bomba) * d_motora
+
+# --- 3. Longitud de la Correa (Fórmula de Mott, Cap. 7) ---
+# L ≈ 2C + 1.57(D₂ + D₁) + (D₂ - D₁)² / 4C
+@grafo.etapa('longitud_calculada', depende_de=('C_in', 'd_bomba', 'd_motora'))
+def calcular_longitud(C, d_bomba, d_motora):
+    return 2 * C + 1.57 * (d_bomba + d_motora) + (d_bomba - d_motora)**2 / (4 * C)
+
+@grafo.etapa('longitud_correa', depende_de=('longitud_calculada',))
+def seleccionar_longitud_correa(L):
     # Seleccionar longitud de correa estándar (basado en catálogos típicos)
     # Para correas 5V, longitudes comunes son 90, 95, 100, 106, 112, etc.
     longitudes_std_5v = [90, 95, 100, 106, 112, 118, 125, 132, 140, 150]
-    longitud_seleccionada = min(longitudes_std_5v, key=lambda x: abs(x - L))
-    resultados['longitud_correa'] = longitud_seleccionada
+    return min(longitudes_std_5v, key=lambda x: abs(x - L))
 
-    # --- 4. Distancia entre Centros Real ---
+# --- 4. Distancia entre Centros Real ---
+@grafo.etapa('C_real', depende_de=('longitud_correa', 'd_bomba', 'd_motora', 'C_in'))
+def calcular_C_real(longitud_seleccionada, d_bomba, d_motora, C):
     # Recalcular C con la longitud estándar (Fórmula de Mott, Cap. 7)
     B = 4 * longitud_seleccionada - 6.28 * (d_bomba + d_motora)
     # Se agrega manejo de error en caso de que el valor dentro de sqrt sea negativo
     try:
-        C_real = (B + math.sqrt(B**2 - 32 * (d_bomba - d_motora)**2)) / 16
+        return (B + math.sqrt(B**2 - 32 * (d_bomba - d_motora)**2)) / 16
     except ValueError:
-        C_real = C # Si hay un error, se mantiene la C original
-    resultados['C_real'] = C_real
+        return C # Si hay un error, se mantiene la C original
 
-    # --- 5. Ángulo de Contacto (Fórmula de Mott, Cap. 7) ---
-    # θ₁ = 180° - 2 * arcsin((D₂ - D₁) / 2C)
+# --- 5. Ángulo de Contacto (Fórmula de Mott, Cap. 7) ---
+# θ₁ = 180° - 2 * arcsin((D₂ - D₁) / 2C)
+@grafo.etapa('angulo_contacto', depende_de=('d_bomba', 'd_motora', 'C_real'))
+def calcular_angulo_contacto(d_bomba, d_motora, C_real):
     try:
         theta_rad = math.pi - 2 * math.asin((d_bomba - d_motora) / (2 * C_real))
-        theta_deg = math.degrees(theta_rad)
+        return math.degrees(theta_rad)
     except ValueError:
-        theta_deg = 180.0 # Ocurre si D1 > D2
-    resultados['angulo_contacto'] = theta_deg
+        return 180.0 # Ocurre si D1 > D2
 
-    # --- 6. Cálculo de Potencia de Diseño y Número de Correas ---
+# --- 6. Cálculo de Potencia de Diseño y Número de Correas ---
+@grafo.etapa('potencia_diseno', depende_de=('potencia_hp',))
+def calcular_potencia_diseno(potencia_hp):
     # Factor de servicio (Tabla 7-1, Mott) para Bomba Centrífuga, >15h/día
     # Motor CA par normal (1.2), Motor de combustión (1.4). Usamos un intermedio
     # conservador para una bomba de lodos.
     factor_servicio = 1.4
-    potencia_diseno = potencia_hp * factor_servicio
-    resultados['potencia_diseno'] = potencia_diseno
+    return potencia_hp * factor_servicio
 
+# Factores de corrección
+@grafo.etapa('C_theta', depende_de=('angulo_contacto',))
+def factor_angulo_contacto(theta_deg):
+    # Factor de corrección por ángulo de contacto (C_theta) - (Fig. 7-14 Mott)
+    if theta_deg > 175: return 1.0
+    elif theta_deg > 165: return 0.98
+    elif theta_deg > 154: return 0.95
+    elif theta_deg > 140: return 0.92
+    else: return 0.88
+
+@grafo.etapa('C_L', depende_de=('longitud_correa',))
+def factor_longitud(longitud_seleccionada):
+    # Factor de corrección por longitud (C_L) - (Fig. 7-15 Mott)
+    if longitud_seleccionada > 132: return 1.05
+    elif longitud_seleccionada > 106: return 1.0
+    else: return 0.95
+
+@grafo.etapa('potencia_corregida', depende_de=('C_theta', 'C_L'))
+def calcular_potencia_corregida(C_theta, C_L):
     # Potencia nominal por correa 5V (Datos de ejemplo basados en tablas de fabricantes)
     # Para d_motora = 8.95" @ 1800 rpm
     potencia_base_correa = 28.5  # HP, valor típico de tablas
     # Potencia adicional por relación de velocidad
-    relacion_velocidad = rpm_motor / rpm_bomba
     potencia_adicional = 0.85 # HP, para VR ~ 1.125
     potencia_nominal_correa = potencia_base_correa + potencia_adicional
+    return potencia_nominal_correa * C_theta * C_L
 
-    # Factores de corrección
-    # Factor de corrección por ángulo de contacto (C_theta) - (Fig. 7-14 Mott)
-    if theta_deg > 175: C_theta = 1.0
-    elif theta_deg > 165: C_theta = 0.98
-    elif theta_deg > 154: C_theta = 0.95
-    elif theta_deg > 140: C_theta = 0.92
-    else: C_theta = 0.88
-    
-    # Factor de corrección por longitud (C_L) - (Fig. 7-15 Mott)
-    if longitud_seleccionada > 132: C_L = 1.05
-    elif longitud_seleccionada > 106: C_L = 1.0
-    else: C_L = 0.95
-
-    potencia_corregida_correa = potencia_nominal_correa * C_theta * C_L
-    resultados['potencia_corregida'] = potencia_corregida_correa
-
-    # Número de correas
+# Número de correas
+@grafo.etapa('num_correas', depende_de=('potencia_diseno', 'potencia_corregida'))
+def calcular_num_correas(potencia_diseno, potencia_corregida_correa):
     num_correas_calculado = potencia_diseno / potencia_corregida_correa
-    num_correas_seleccionado = math.ceil(num_correas_calculado)
-    resultados['num_correas'] = num_correas_seleccionado
+    return math.ceil(num_correas_calculado)
 
-    # --- 7. Factor de Seguridad ---
+# --- 7. Factor de Seguridad ---
+@grafo.etapa('factor_seguridad', depende_de=('num_correas', 'potencia_corregida', 'potencia_diseno'))
+def calcular_factor_seguridad(num_correas, potencia_corregida_correa, potencia_diseno):
     # Relación entre la capacidad total instalada y la potencia de diseño
-    capacidad_total = num_correas_seleccionado * potencia_corregida_correa
-    factor_seguridad = capacidad_total / potencia_diseno
-    resultados['factor_seguridad'] = factor_seguridad
+    capacidad_total = num_correas * potencia_corregida_correa
+    return capacidad_total / potencia_diseno
 
-    return resultados
+def calcular_diseno_correa(potencia_hp, rpm_motor, rpm_bomba, d_motora, C_mm):
+    """
+    Realiza los cálculos de diseño para la transmisión por correa en V.
+    """
+    valores, _ = grafo.evaluar({
+        'potencia_hp': potencia_hp,
+        'rpm_motor': rpm_motor,
+        'rpm_bomba': rpm_bomba,
+        'd_motora': d_motora,
+        'C_mm': C_mm
+    })
+    return {clave: valores[clave] for clave in CLAVES_RESULTADOS}
 
 def generar_grafico_bomba():
     """
     Genera el gráfico de las curvas de la bomba y la resistencia del sistema.
     Los datos se extraen visualmente del PDF "WPA43A03_RZ_4X3...".
+    Se usa como la etapa `grafico` del grafo, que lo guarda en caché.
     """
     # Datos extraídos del PDF para la bomba Warman 4/3 AH
     # Curva a 1600 RPM
@@ -172,21 +207,33 @@ def generar_grafico_bomba():
     
     return plot_data
 
+# El gráfico no depende de ninguna entrada del formulario: el grafo lo calcula
+# en la primera evaluación y lo omite en todas las siguientes
+@grafo.etapa('grafico')
+def calcular_grafico():
+    return generar_grafico_bomba()
+
 # --- Rutas de la Aplicación ---
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
         # Obtener datos del formulario
-        potencia_hp = float(request.form.get('potencia_hp'))
-        rpm_motor = float(request.form.get('rpm_motor'))
-        rpm_bomba = float(request.form.get('rpm_bomba'))
-        d_motora = float(request.form.get('d_motora'))
-        C_mm = float(request.form.get('C_mm'))
-
-        # Realizar cálculos
-        resultados = calcular_diseno_correa(potencia_hp, rpm_motor, rpm_bomba, d_motora, C_mm)
-        plot_url = generar_grafico_bomba()
+        entradas = {campo: float(request.form.get(campo)) for campo in grafo.entradas}
+
+        # Realizar cálculos; el gráfico es una etapa más del grafo
+        valores, _ = grafo.evaluar(entradas)
+        resultados = {clave: valores[clave] for clave in CLAVES_RESULTADOS}
+        plot_url = valores['grafico']
+
+        # Guardar en el historial (escritura diferida, no bloquea la respuesta)
+        if not app.config.get('HISTORIAL_DESACTIVADO'):
+            historial.registrar('bomba_4x3', request.form.to_dict(), resultados,
+                                hp=entradas['potencia_hp'], rpm_motor=entradas['rpm_motor'],
+                                rpm_bomba=entradas['rpm_bomba'],
+                                d_motora=entradas['d_motora'], d_bomba=resultados['d_bomba'],
+                                longitud=resultados['longitud_correa'],
+                                factor_seguridad=resultados['factor_seguridad'])
         
         return render_template('index.html', 
                                resultados=resultados, 
@@ -204,6 +251,44 @@ def index():
     }
     return render_template('index.html', resultados=None, plot_url=None, form_data=default_data)
 
+@app.route('/recalculo')
+def recalculo():
+    """
+    Recálculo en vivo mientras el usuario escribe (Server-Sent Events).
+    Evalúa el grafo con las entradas de la URL, de modo que solo se
+    recalculan las etapas afectadas por el cambio. El gráfico se envía
+    únicamente si cambió o si el cliente lo pide con `con_grafico=1`.
+    """
+    # Entradas incompletas o inválidas mientras se escribe: no hay resultado.
+    # No se usa el nombre `error`, que EventSource reserva para fallos de red
+    sin_resultado = Response('event: invalido\ndata: {}\n\n', mimetype='text/event-stream')
+
+    inicio = time.perf_counter()
+    try:
+        entradas = {campo: float(request.args[campo]) for campo in grafo.entradas}
+    except (KeyError, ValueError):
+        return sin_resultado
+    # Todas las entradas son magnitudes físicas: finitas y positivas
+    if not all(math.isfinite(valor) and valor > 0 for valor in entradas.values()):
+        return sin_resultado
+
+    try:
+        valores, recalculadas = grafo.evaluar(entradas)
+        datos = {
+            'resultados': {clave: valores[clave] for clave in CLAVES_RESULTADOS},
+            'recalculadas': recalculadas,
+            'tiempo_ms': round((time.perf_counter() - inicio) * 1000, 2)
+        }
+        if 'grafico' in recalculadas or request.args.get('con_grafico'):
+            datos['plot_url'] = valores['grafico']
+        # allow_nan=False: NaN o Infinity no son JSON válido para el cliente
+        cuerpo = json.dumps(datos, allow_nan=False)
+    except (ValueError, ZeroDivisionError, OverflowError):
+        return sin_resultado
+    return Response(f'event: resultado\ndata: {cuerpo}\n\n',
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
 # --- Plantilla HTML (embebida para simplicidad) ---
 # En un proyecto más grande, esto estaría en un archivo separado `templates/index.html`
 
@@ -305,6 +390,26 @@ def custom_render_template(template_name, **context):
 app.jinja_env.globals['render_template'] = custom_render_template
 
 
+# --- Precalentamiento para el servidor de producción (servidor.py) ---
+
+# Petición de referencia usada para medir la primera respuesta
+PETICION_EJEMPLO = ('/', {
+    'potencia_hp': 75.0,
+    'rpm_motor': 1800.0,
+    'rpm_bomba': 1600.0,
+    'd_motora': 8.95,
+    'C_mm': 620.0
+})
+
+def precalentar():
+    """
+    Evalúa el grafo con la petición de ejemplo: deja en caché todas sus
+    etapas, incluido el gráfico de la bomba (fuentes y backend Agg cargados),
+    antes de que servidor.py cree los workers con fork().
+    """
+    grafo.evaluar(PETICION_EJEMPLO[1])
+
+
 # Punto de entrada para ejecutar la aplicación
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
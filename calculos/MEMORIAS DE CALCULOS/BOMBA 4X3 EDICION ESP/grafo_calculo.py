@@ -0,0 +1,71 @@
+# -----------------------------------------------------------------------------
+# Grafo de dependencias con etapas en caché para el recálculo incremental.
+#
+# Cada etapa declara de qué entradas u otras etapas depende. Al evaluar, una
+# etapa solo se vuelve a calcular si no tiene en caché el valor para esos
+# mismos argumentos. Así, al cambiar la distancia entre centros no se
+# recalcula el diámetro de la polea ni la potencia de diseño, y el gráfico
+# (que no depende del formulario) se genera una sola vez.
+#
+# La caché de cada etapa es un LRU acotado por tupla de argumentos, de modo
+# que varios usuarios escribiendo a la vez no se invalidan entre sí.
+# -----------------------------------------------------------------------------
+
+import threading
+from collections import OrderedDict
+
+
+class GrafoCalculo:
+    """
+    Grafo de etapas de cálculo. Las etapas se registran en orden topológico:
+    cada una solo puede depender de entradas o de etapas ya registradas.
+    """
+
+    def __init__(self, entradas, tamano_cache=256):
+        self.entradas = tuple(entradas)
+        self.tamano_cache = tamano_cache
+        self._etapas = {}  # nombre -> (dependencias, función), en orden de registro
+        self._cache = {}   # nombre -> OrderedDict(argumentos -> valor), LRU
+        # Una evaluación a la vez: la caché es compartida por las peticiones
+        # del proceso y matplotlib no es seguro entre hilos
+        self._lock = threading.Lock()
+
+    def etapa(self, nombre, depende_de=()):
+        """Decorador que registra `funcion(*dependencias)` como la etapa `nombre`."""
+        for dependencia in depende_de:
+            if dependencia not in self.entradas and dependencia not in self._etapas:
+                raise ValueError(f"La etapa '{nombre}' depende de '{dependencia}', que no está definida")
+        if nombre in self.entradas or nombre in self._etapas:
+            raise ValueError(f"La etapa '{nombre}' ya está definida")
+
+        def registrar(funcion):
+            self._etapas[nombre] = (tuple(depende_de), funcion)
+            self._cache[nombre] = OrderedDict()
+            return funcion
+        return registrar
+
+    def evaluar(self, valores_entrada):
+        """
+        Evalúa el grafo con las entradas dadas.
+        Devuelve (valores, recalculadas): el valor de cada entrada y etapa, y
+        la lista de etapas que se calcularon de nuevo en esta evaluación.
+        """
+        faltantes = [e for e in self.entradas if e not in valores_entrada]
+        if faltantes:
+            raise ValueError(f"Faltan entradas: {', '.join(faltantes)}")
+
+        valores = {e: valores_entrada[e] for e in self.entradas}
+        recalculadas = []
+        with self._lock:
+            for nombre, (dependencias, funcion) in self._etapas.items():
+                argumentos = tuple(valores[d] for d in dependencias)
+                cache = self._cache[nombre]
+                if argumentos in cache:
+                    cache.move_to_end(argumentos)
+                    valores[nombre] = cache[argumentos]
+                    continue
+                valores[nombre] = cache[argumentos] = funcion(*argumentos)
+                if len(cache) > self.tamano_cache:
+                    cache.popitem(last=False)
+                recalculadas.append(nombre)
+        return valores, recalculadas
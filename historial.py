@@ -0,0 +1,369 @@
+# -----------------------------------------------------------------------------
+# Historial persistente de diseños (SQLite)
+#
+# Las calculadoras registran entradas y resultados con `registrar()`. Los
+# registros se encolan en memoria y un hilo en segundo plano los inserta por
+# lotes, así la petición nunca espera a la base de datos. `consultar()` filtra
+# por los campos indexados y pagina por cursor (id, o (campo, id) con filtros
+# de rango), lo que mantiene cada página igual de rápida aunque la tabla tenga
+# millones de filas.
+#
+# Ejemplo: todos los diseños con factor de seguridad <= 1.2 a 1600 RPM
+#    consultar(rpm_bomba=1600, factor_seguridad_max=1.2)
+#    GET /historial?rpm_bomba=1600&factor_seguridad_max=1.2
+#
+# La base de datos se guarda en POLEAS_HISTORIAL_DB (por defecto
+# historial_disenos.db en la raíz del repositorio). Las calculadoras no
+# registran nada mientras app.config['HISTORIAL_DESACTIVADO'] sea verdadero;
+# servidor.py lo activa durante el precalentamiento.
+# -----------------------------------------------------------------------------
+
+import atexit
+import json
+import math
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from flask import Blueprint, request
+
+RUTA_DB = os.environ.get(
+    'POLEAS_HISTORIAL_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historial_disenos.db'))
+
+# Campos indexados, comunes a todas las calculadoras
+CAMPOS = ('hp', 'rpm_motor', 'rpm_bomba', 'd_motora', 'd_bomba', 'longitud', 'factor_seguridad')
+
+TAMANO_LOTE = 500        # filas por transacción
+INTERVALO_LOTE = 0.5     # segundos máximos que una fila espera en la cola
+MAX_PENDIENTES = 10000   # con la cola llena los registros nuevos se descartan
+LIMITE_PAGINA = 500      # tamaño máximo de página en consultar()
+MAX_ID = 2**63 - 1       # mayor INTEGER de SQLite
+INTERVALO_OPTIMIZAR = 600  # segundos entre PRAGMA optimize del hilo de escritura
+REINTENTO_MIN, REINTENTO_MAX = 1, 60  # espera (s) entre intentos de abrir la base
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS disenos (
+    id INTEGER PRIMARY KEY,
+    creado REAL NOT NULL,
+    origen TEXT NOT NULL,
+    hp REAL,
+    rpm_motor REAL,
+    rpm_bomba REAL,
+    d_motora REAL,
+    d_bomba REAL,
+    longitud REAL,
+    factor_seguridad REAL,
+    entradas TEXT NOT NULL,
+    resultados TEXT NOT NULL
+);
+-- Con id al final, ORDER BY id DESC (o campo DESC, id DESC) recorre el índice
+-- en vez de ordenar las filas que cumplen el filtro
+CREATE INDEX IF NOT EXISTS idx_disenos_hp_id ON disenos (hp, id);
+CREATE INDEX IF NOT EXISTS idx_disenos_rpm_motor_id ON disenos (rpm_motor, id);
+CREATE INDEX IF NOT EXISTS idx_disenos_rpm_bomba_id ON disenos (rpm_bomba, id);
+CREATE INDEX IF NOT EXISTS idx_disenos_d_motora_id ON disenos (d_motora, id);
+CREATE INDEX IF NOT EXISTS idx_disenos_d_bomba_id ON disenos (d_bomba, id);
+CREATE INDEX IF NOT EXISTS idx_disenos_longitud_id ON disenos (longitud, id);
+CREATE INDEX IF NOT EXISTS idx_disenos_factor_seguridad_id ON disenos (factor_seguridad, id);
+-- Filtro habitual: factor de seguridad en un rango a unas RPM dadas
+CREATE INDEX IF NOT EXISTS idx_disenos_rpm_motor_fs_id ON disenos (rpm_motor, factor_seguridad, id);
+CREATE INDEX IF NOT EXISTS idx_disenos_rpm_bomba_fs_id ON disenos (rpm_bomba, factor_seguridad, id);
+"""
+
+INSERTAR = (
+    f"INSERT INTO disenos (creado, origen, {', '.join(CAMPOS)}, entradas, resultados) "
+    f"VALUES ({', '.join('?' * (len(CAMPOS) + 4))})")
+
+_cola = None
+_pid = None
+_lock = threading.Lock()
+_sin_base = None         # threading.Event: el último intento de abrir la base falló
+descartados = 0
+_descartados_informados = 0
+
+
+def _conectar():
+    """Conexión del hilo de escritura; crea la base si no existe."""
+    conexion = sqlite3.connect(RUTA_DB, timeout=30)
+    # WAL permite leer mientras otro proceso (u otro worker) escribe
+    conexion.execute('PRAGMA journal_mode=WAL')
+    conexion.execute('PRAGMA synchronous=NORMAL')
+    return conexion
+
+
+def _conectar_lectura():
+    """Conexión de solo lectura para consultar(): no crea ni modifica la base."""
+    return sqlite3.connect(f'{Path(RUTA_DB).resolve().as_uri()}?mode=ro', uri=True, timeout=30)
+
+
+def _informar_descartados():
+    """Escribe en stderr cuántos diseños se descartaron desde el último aviso."""
+    global _descartados_informados
+    nuevos = descartados - _descartados_informados
+    if nuevos:
+        _descartados_informados += nuevos
+        print(f'historial: {nuevos} diseños descartados con la cola llena '
+              f'({_descartados_informados} en total)', file=sys.stderr)
+
+
+def _preparar():
+    """Abre la base del hilo de escritura y crea el esquema si hace falta."""
+    conexion = _conectar()
+    try:
+        conexion.executescript(ESQUEMA)
+        # Estadísticas del planificador: analysis_limit acota el costo de
+        # ANALYZE en tablas grandes; 0x10002 analiza también las tablas sin
+        # estadísticas
+        conexion.execute('PRAGMA analysis_limit=1000')
+        conexion.execute('PRAGMA optimize=0x10002')
+    except sqlite3.Error:
+        conexion.close()
+        raise
+    return conexion
+
+
+def _escribir(cola, sin_base):
+    """Hilo de escritura: agrupa las filas encoladas y las inserta por lotes."""
+    # Si la base no se puede abrir (ruta sin permisos, o bloqueada mientras
+    # otro worker crea los índices) se reintenta con espera creciente; las
+    # filas se acumulan en la cola mientras tanto
+    espera = REINTENTO_MIN
+    while True:
+        try:
+            conexion = _preparar()
+            break
+        except sqlite3.Error as error:
+            sin_base.set()
+            print(f'historial: no se pudo abrir {RUTA_DB}: {error}; '
+                  f'nuevo intento en {espera} s', file=sys.stderr)
+            _informar_descartados()
+            time.sleep(espera)
+            espera = min(espera * 2, REINTENTO_MAX)
+    sin_base.clear()
+
+    proximo_optimizar = time.monotonic() + INTERVALO_OPTIMIZAR
+    while True:
+        lote = [cola.get()]
+        limite = time.monotonic() + INTERVALO_LOTE
+        while len(lote) < TAMANO_LOTE:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        try:
+            with conexion:
+                conexion.executemany(INSERTAR, lote)
+        except sqlite3.Error as error:
+            print(f'historial: no se guardaron {len(lote)} diseños: {error}', file=sys.stderr)
+        for _ in lote:
+            cola.task_done()
+        _informar_descartados()
+        if time.monotonic() >= proximo_optimizar:
+            try:
+                conexion.execute('PRAGMA optimize')
+            except sqlite3.Error as error:
+                print(f'historial: PRAGMA optimize falló: {error}', file=sys.stderr)
+            proximo_optimizar = time.monotonic() + INTERVALO_OPTIMIZAR
+
+
+def _cola_del_proceso():
+    """
+    Devuelve la cola del proceso actual, creando su hilo de escritura si hace
+    falta. Los hilos no sobreviven a fork(), así que cada worker de
+    servidor.py arranca el suyo en su primer registro.
+    """
+    global _cola, _pid, _sin_base
+    if _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid():
+                _cola = queue.Queue(maxsize=MAX_PENDIENTES)
+                _sin_base = threading.Event()
+                threading.Thread(target=_escribir, args=(_cola, _sin_base),
+                                 name='historial', daemon=True).start()
+                _pid = os.getpid()
+    return _cola
+
+
+def registrar(origen, entradas, resultados, **campos):
+    """
+    Encola un diseño para guardarlo en el historial sin bloquear la petición.
+    `campos` son los valores indexados (ver CAMPOS); si la cola está llena el
+    diseño se descarta, se cuenta en `descartados` y el hilo de escritura lo
+    informa en stderr.
+    """
+    global descartados
+    desconocidos = set(campos) - set(CAMPOS)
+    if desconocidos:
+        raise ValueError(f"Campos no indexados: {', '.join(sorted(desconocidos))}")
+
+    fila = (time.time(), origen, *(campos.get(campo) for campo in CAMPOS),
+            json.dumps(entradas, default=float), json.dumps(resultados, default=float))
+    try:
+        _cola_del_proceso().put_nowait(fila)
+    except queue.Full:
+        descartados += 1
+
+
+def vaciar(tiempo_max=5.0):
+    """
+    Espera a que se escriban los diseños pendientes de este proceso.
+    Se llama al salir con atexit (`python app.py`) y desde el hook
+    worker_exit de servidor.py, porque los workers de gunicorn terminan sin
+    ejecutar atexit. Si el proceso muere por una señal que no se puede
+    capturar (SIGKILL) se pierden las filas que aún estén en la cola.
+    Si el hilo no logra abrir la base no se espera: las filas pendientes
+    se dan por perdidas y se informa en stderr.
+    """
+    if _pid != os.getpid():
+        return
+    _informar_descartados()
+    if _sin_base.is_set():
+        if _cola.unfinished_tasks:
+            print(f'historial: {_cola.unfinished_tasks} diseños sin guardar, '
+                  f'no se pudo abrir {RUTA_DB}', file=sys.stderr)
+        return
+    limite = time.monotonic() + tiempo_max
+    while _cola.unfinished_tasks and time.monotonic() < limite:
+        time.sleep(0.01)
+
+
+atexit.register(vaciar)
+
+
+def _leer_cursor(antes_de, campo_orden):
+    """Convierte el cursor `antes_de` en los valores de la clave de orden."""
+    partes = str(antes_de).split(',')
+    try:
+        if len(partes) != (2 if campo_orden else 1):
+            raise ValueError
+        id_ = int(partes[-1])
+        # Fuera de este rango SQLite no puede enlazar el entero (OverflowError)
+        if not 0 <= id_ <= MAX_ID:
+            raise ValueError
+        if campo_orden:
+            valor = float(partes[0])
+            if not math.isfinite(valor):
+                raise ValueError
+            return valor, id_
+        return (id_,)
+    except ValueError:
+        raise ValueError(f"Cursor inválido: {antes_de}") from None
+
+
+def consultar(limite=50, antes_de=None, origen=None, **filtros):
+    """
+    Devuelve una página de diseños.
+
+    Cada campo de CAMPOS admite `campo=valor`, `campo_min=valor` (>=) y
+    `campo_max=valor` (<=). Sin filtros de rango los diseños salen del más
+    reciente al más antiguo; con un filtro de rango salen ordenados por ese
+    campo (descendente) y luego por id, para recorrer el índice (campo, id)
+    en vez de ordenar todas las filas que cumplen el filtro.
+
+    Para la página siguiente pase `antes_de` con el valor `siguiente` de la
+    respuesta anterior; la paginación por cursor evita el costo de OFFSET en
+    tablas grandes.
+    """
+    condiciones = []
+    parametros = []
+    campo_orden = None
+    for clave, valor in filtros.items():
+        if clave.endswith('_min'):
+            campo, operador = clave[:-4], '>='
+        elif clave.endswith('_max'):
+            campo, operador = clave[:-4], '<='
+        else:
+            campo, operador = clave, '='
+        if campo not in CAMPOS:
+            raise ValueError(f"Filtro desconocido: {clave}")
+        if operador != '=' and campo_orden is None:
+            campo_orden = campo
+        condiciones.append(f'{campo} {operador} ?')
+        parametros.append(valor)
+    if origen is not None:
+        condiciones.append('origen = ?')
+        parametros.append(origen)
+
+    if campo_orden:
+        orden = f'{campo_orden} DESC, id DESC'
+        clave_cursor = f'({campo_orden}, id)'
+    else:
+        orden = 'id DESC'
+        clave_cursor = 'id'
+    if antes_de is not None:
+        cursor = _leer_cursor(antes_de, campo_orden)
+        condiciones.append(f"{clave_cursor} < {'(?, ?)' if campo_orden else '?'}")
+        parametros.extend(cursor)
+
+    limite = max(1, min(int(limite), LIMITE_PAGINA))
+    sql = (f"SELECT id, creado, origen, {', '.join(CAMPOS)}, entradas, resultados FROM disenos"
+           f"{' WHERE ' + ' AND '.join(condiciones) if condiciones else ''}"
+           f" ORDER BY {orden} LIMIT ?")
+
+    # Aún no se ha registrado ningún diseño
+    if not os.path.exists(RUTA_DB):
+        return {'disenos': [], 'siguiente': None}
+    conexion = _conectar_lectura()
+    try:
+        filas = conexion.execute(sql, (*parametros, limite)).fetchall()
+    except sqlite3.OperationalError as error:
+        # El hilo de escritura creó el archivo pero aún no el esquema
+        if 'no such table' in str(error):
+            filas = []
+        else:
+            raise
+    finally:
+        conexion.close()
+
+    disenos = []
+    for fila in filas:
+        diseno = dict(zip(('id', 'creado', 'origen', *CAMPOS), fila[:-2]))
+        diseno['entradas'] = json.loads(fila[-2])
+        diseno['resultados'] = json.loads(fila[-1])
+        disenos.append(diseno)
+
+    siguiente = None
+    if len(disenos) == limite:
+        ultimo = disenos[-1]
+        siguiente = f"{ultimo[campo_orden]!r},{ultimo['id']}" if campo_orden else str(ultimo['id'])
+    return {'disenos': disenos, 'siguiente': siguiente}
+
+
+def consultar_desde_args(args):
+    """Traduce los parámetros de la URL de /historial a una llamada a consultar()."""
+    args = dict(args)
+    try:
+        limite = int(args.pop('limite', 50))
+        antes_de = args.pop('antes_de', None)
+        origen = args.pop('origen', None)
+        filtros = {clave: float(valor) for clave, valor in args.items()}
+    except ValueError:
+        raise ValueError('Los filtros, limite y antes_de deben ser numéricos')
+    no_finitos = [clave for clave, valor in filtros.items() if not math.isfinite(valor)]
+    if no_finitos:
+        raise ValueError(f"Filtros no finitos: {', '.join(no_finitos)}")
+    return consultar(limite=limite, antes_de=antes_de, origen=origen, **filtros)
+
+
+# Las calculadoras montan /historial con app.register_blueprint(historial.rutas)
+rutas = Blueprint('historial', __name__)
+
+
+@rutas.route('/historial')
+def historial_disenos():
+    """
+    Consulta paginada de diseños anteriores, p. ej.
+    /historial?rpm_bomba=1600&factor_seguridad_max=1.2
+    """
+    try:
+        return consultar_desde_args(request.args)
+    except ValueError as error:
+        return {'error': str(error)}, 400
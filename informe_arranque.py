@@ -0,0 +1,147 @@
+# -----------------------------------------------------------------------------
+# Informe de arranque en frío de una calculadora servida con gunicorn
+#
+# Arranca la aplicación con la configuración de servidor.py dos veces, con y
+# sin precalentamiento, y mide el tiempo hasta la primera respuesta, la
+# latencia de la primera petición y la de las peticiones en régimen.
+#
+# precalentar() deja en caché el gráfico de PETICION_EJEMPLO, así que repetir
+# esa petición solo mide un acierto de caché. Por eso se informan por
+# separado los puntos de operación nuevos (otras RPM de la bomba, que exigen
+# dibujar un gráfico) y el punto ya precalentado.
+#
+# Uso (Linux/macOS):
+#    python informe_arranque.py app/app.py
+#    python informe_arranque.py "calculos/MEMORIAS DE CALCULOS/BOMBA 4X3 EDICION ESP/app.py"
+# -----------------------------------------------------------------------------
+
+import argparse
+import ast
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+
+def leer_peticion_ejemplo(ruta_app):
+    """Lee PETICION_EJEMPLO del archivo de la aplicación sin importarla."""
+    with open(ruta_app, encoding='utf-8') as archivo:
+        arbol = ast.parse(archivo.read())
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.Assign) and any(
+                isinstance(destino, ast.Name) and destino.id == 'PETICION_EJEMPLO' for destino in nodo.targets):
+            return ast.literal_eval(nodo.value)
+    raise ValueError(f'{ruta_app} no define PETICION_EJEMPLO')
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def punto_nuevo(datos, n):
+    """
+    Copia de la petición de ejemplo con otras RPM de la bomba: un punto de
+    operación que el precalentamiento no renderizó.
+    """
+    return {**datos, 'rpm_bomba': float(datos['rpm_bomba']) - 1 - n}
+
+
+def medir_peticion(url, datos):
+    """Envía una petición POST y devuelve su latencia en milisegundos."""
+    cuerpo = urllib.parse.urlencode(datos).encode('utf-8')
+    peticion = urllib.request.Request(url, data=cuerpo)
+    inicio = time.perf_counter()
+    with urllib.request.urlopen(peticion, timeout=60) as respuesta:
+        respuesta.read()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def esperar_puerto(puerto, proceso, tiempo_max=60):
+    limite = time.monotonic() + tiempo_max
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f'gunicorn terminó con código {proceso.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', puerto), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError('gunicorn no empezó a escuchar a tiempo')
+
+
+def medir_arranque(ruta_app, workers, precalentar, repeticiones):
+    """Arranca gunicorn una vez y devuelve un diccionario de tiempos en ms."""
+    ruta, datos = leer_peticion_ejemplo(ruta_app)
+    puerto = puerto_libre()
+    url = f'http://127.0.0.1:{puerto}{ruta}'
+    entorno = dict(os.environ)
+    if not precalentar:
+        entorno['POLEAS_SIN_PRECALENTAR'] = '1'
+
+    tiempos = {}
+    with tempfile.TemporaryDirectory() as temporal:
+        # Las mediciones no se guardan en el historial real
+        entorno['POLEAS_HISTORIAL_DB'] = os.path.join(temporal, 'historial.db')
+        inicio = time.perf_counter()
+        proceso = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', os.path.join(RAIZ, 'servidor.py'),
+             '--chdir', os.path.dirname(os.path.abspath(ruta_app)),
+             '-b', f'127.0.0.1:{puerto}', '-w', str(workers),
+             f'{os.path.splitext(os.path.basename(ruta_app))[0]}:app'],
+            env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            esperar_puerto(puerto, proceso)
+            tiempos['Arranque hasta escuchar'] = (time.perf_counter() - inicio) * 1000
+            tiempos['Primera petición, punto nuevo'] = medir_peticion(url, punto_nuevo(datos, 0))
+            tiempos['Arranque hasta la primera respuesta'] = (time.perf_counter() - inicio) * 1000
+            tiempos['Primera petición, punto precalentado'] = medir_peticion(url, datos)
+            tiempos['En régimen, puntos nuevos (mediana)'] = statistics.median(
+                medir_peticion(url, punto_nuevo(datos, n)) for n in range(1, repeticiones + 1))
+            tiempos['En régimen, punto repetido (mediana)'] = statistics.median(
+                medir_peticion(url, datos) for _ in range(repeticiones))
+        except (OSError, RuntimeError, urllib.error.URLError) as error:
+            # Se informa el fallo en vez de abortar: la otra medición sigue siendo útil
+            tiempos['error'] = str(error)
+        finally:
+            proceso.send_signal(signal.SIGTERM)
+            proceso.wait(timeout=30)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Informe de arranque en frío con gunicorn')
+    parser.add_argument('app', help='Ruta del archivo app.py a medir')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--repeticiones', type=int, default=10)
+    args = parser.parse_args()
+
+    columnas = {
+        'Con precalentamiento': medir_arranque(args.app, args.workers, True, args.repeticiones),
+        'Sin precalentamiento': medir_arranque(args.app, args.workers, False, args.repeticiones),
+    }
+    filas = ['Arranque hasta escuchar', 'Primera petición, punto nuevo',
+             'Arranque hasta la primera respuesta', 'Primera petición, punto precalentado',
+             'En régimen, puntos nuevos (mediana)', 'En régimen, punto repetido (mediana)']
+    print(f"{'--- Informe de arranque ---':<40}" + ''.join(f'{nombre:>24}' for nombre in columnas))
+    for fila in filas:
+        celdas = ''.join(f"{tiempos[fila]:>21.1f} ms" if fila in tiempos else f"{'-':>24}"
+                         for tiempos in columnas.values())
+        print(f'{fila:<40}{celdas}')
+    for nombre, tiempos in columnas.items():
+        if 'error' in tiempos:
+            print(f"{nombre}: la medición falló: {tiempos['error']}")
+
+
+if __name__ == '__main__':
+    main()
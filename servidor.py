@@ -0,0 +1,73 @@
+# -----------------------------------------------------------------------------
+# Configuración de gunicorn para servir las calculadoras Flask en producción
+#
+# Con preload_app el proceso maestro importa la aplicación una sola vez. Antes
+# de crear los workers, el hook on_starting llama a su función `precalentar()`
+# (tablas de catálogo, curvas ajustadas, gráfico de ejemplo ya renderizado) y
+# atiende una petición de ejemplo para compilar la plantilla. Los workers
+# nacen con fork() y comparten esa memoria copy-on-write en vez de pagar cada
+# uno la importación de matplotlib y la primera figura.
+#
+# Uso (Linux/macOS; gunicorn no funciona en Windows):
+#    gunicorn -c servidor.py --chdir app app:app
+#    gunicorn -c servidor.py --chdir "calculos/MEMORIAS DE CALCULOS/BOMBA 4X3 EDICION ESP" app:app
+#
+# Con POLEAS_SIN_PRECALENTAR=1 se omite el precalentamiento (línea base).
+# El informe de tiempos de arranque está en informe_arranque.py.
+# -----------------------------------------------------------------------------
+
+import gc
+import os
+import sys
+import time
+
+bind = '127.0.0.1:8000'
+workers = os.cpu_count() or 2
+preload_app = True
+
+
+def precalentar_aplicacion(app):
+    """
+    Precalienta la aplicación Flask `app` en el proceso actual.
+    Devuelve una lista de (etapa, milisegundos).
+    """
+    modulo = sys.modules[app.import_name]
+    tiempos = []
+
+    inicio = time.perf_counter()
+    modulo.precalentar()
+    tiempos.append(('Precalentamiento (tablas, curvas, Agg)', (time.perf_counter() - inicio) * 1000))
+
+    # Una petición completa compila también la plantilla Jinja; el diseño de
+    # ejemplo no se guarda en el historial
+    ruta, datos = modulo.PETICION_EJEMPLO
+    desactivado = app.config.get('HISTORIAL_DESACTIVADO')
+    app.config['HISTORIAL_DESACTIVADO'] = True
+    try:
+        inicio = time.perf_counter()
+        app.test_client().post(ruta, data=datos)
+        tiempos.append(('Petición de ejemplo', (time.perf_counter() - inicio) * 1000))
+    finally:
+        app.config['HISTORIAL_DESACTIVADO'] = desactivado
+    return tiempos
+
+
+def on_starting(server):
+    if os.environ.get('POLEAS_SIN_PRECALENTAR'):
+        return
+    for etapa, ms in precalentar_aplicacion(server.app.wsgi()):
+        server.log.info('%s: %.1f ms', etapa, ms)
+
+
+def pre_fork(server, worker):
+    # Los objetos creados hasta aquí no se vuelven a recorrer por el GC, así
+    # los workers no ensucian (y copian) las páginas compartidas con el padre
+    gc.freeze()
+
+
+def worker_exit(server, worker):
+    # El worker termina sin pasar por atexit: se escriben aquí los diseños
+    # que aún esperan en la cola del historial
+    historial = sys.modules.get('historial')
+    if historial is not None:
+        historial.vaciar()
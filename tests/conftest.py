@@ -0,0 +1,34 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+DIR_BOMBA_4X3 = RAIZ / 'calculos' / 'MEMORIAS DE CALCULOS' / 'BOMBA 4X3 EDICION ESP'
+
+# Igual que al ejecutar `python app.py` desde su carpeta: grafo_calculo.py es
+# un módulo hermano de la aplicación
+sys.path.insert(0, str(DIR_BOMBA_4X3))
+
+
+def cargar_modulo(nombre, ruta):
+    """Importa un archivo de aplicación con un nombre de módulo propio."""
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    spec = importlib.util.spec_from_file_location(nombre, ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    # Flask localiza la carpeta templates a partir de sys.modules[__name__]
+    sys.modules[nombre] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+@pytest.fixture(scope='session')
+def app_bomba_4x3():
+    return cargar_modulo('app_bomba_4x3', DIR_BOMBA_4X3 / 'app.py')
+
+
+@pytest.fixture(scope='session')
+def app_raiz():
+    return cargar_modulo('app_raiz', RAIZ / 'app.py')
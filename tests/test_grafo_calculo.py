@@ -0,0 +1,194 @@
+import math
+import random
+
+import pytest
+
+from grafo_calculo import GrafoCalculo
+
+
+def grafo_contado():
+    """Grafo a, b -> x(a), y(b), signo(x), z(signo, y) que cuenta sus llamadas."""
+    llamadas = []
+    grafo = GrafoCalculo(entradas=('a', 'b'))
+
+    @grafo.etapa('x', depende_de=('a',))
+    def calcular_x(a):
+        llamadas.append('x')
+        return a * 2
+
+    @grafo.etapa('y', depende_de=('b',))
+    def calcular_y(b):
+        llamadas.append('y')
+        return b + 1
+
+    @grafo.etapa('signo', depende_de=('x',))
+    def calcular_signo(x):
+        llamadas.append('signo')
+        return x > 0
+
+    @grafo.etapa('z', depende_de=('signo', 'y'))
+    def calcular_z(signo, y):
+        llamadas.append('z')
+        return y if signo else -y
+
+    return grafo, llamadas
+
+
+def test_primera_evaluacion_calcula_todo():
+    grafo, llamadas = grafo_contado()
+    valores, recalculadas = grafo.evaluar({'a': 1, 'b': 2})
+    assert recalculadas == ['x', 'y', 'signo', 'z']
+    assert llamadas == recalculadas
+    assert valores['z'] == 3
+
+
+def test_solo_se_recalculan_las_etapas_aguas_abajo():
+    grafo, llamadas = grafo_contado()
+    grafo.evaluar({'a': 1, 'b': 2})
+    llamadas.clear()
+
+    valores, recalculadas = grafo.evaluar({'a': 1, 'b': 5})
+    assert recalculadas == ['y', 'z']
+    assert llamadas == ['y', 'z']
+    assert valores['z'] == 6
+
+
+def test_la_propagacion_se_detiene_si_el_valor_no_cambia():
+    grafo, llamadas = grafo_contado()
+    grafo.evaluar({'a': 1, 'b': 2})
+    llamadas.clear()
+
+    # x cambia, pero signo sigue siendo True: z reutiliza su valor
+    _, recalculadas = grafo.evaluar({'a': 3, 'b': 2})
+    assert recalculadas == ['x', 'signo']
+
+
+def test_entradas_iguales_no_recalculan_nada():
+    grafo, llamadas = grafo_contado()
+    grafo.evaluar({'a': 1, 'b': 2})
+    llamadas.clear()
+    _, recalculadas = grafo.evaluar({'a': 1, 'b': 2})
+    assert recalculadas == []
+    assert llamadas == []
+
+
+def test_clientes_alternados_no_se_invalidan_la_cache():
+    grafo, llamadas = grafo_contado()
+    grafo.evaluar({'a': 1, 'b': 2})   # cliente A
+    grafo.evaluar({'a': -4, 'b': 9})  # cliente B
+    llamadas.clear()
+
+    _, recalculadas = grafo.evaluar({'a': 1, 'b': 2})  # A de nuevo
+    assert recalculadas == []
+
+
+def test_la_cache_esta_acotada():
+    grafo = GrafoCalculo(entradas=('a',), tamano_cache=2)
+    llamadas = []
+
+    @grafo.etapa('x', depende_de=('a',))
+    def calcular_x(a):
+        llamadas.append(a)
+        return a
+
+    for a in (1, 2, 3, 1):
+        grafo.evaluar({'a': a})
+    # 1 salió de la caché al entrar 3, así que se calcula de nuevo
+    assert llamadas == [1, 2, 3, 1]
+
+
+def test_dependencia_no_definida():
+    grafo = GrafoCalculo(entradas=('a',))
+    with pytest.raises(ValueError):
+        grafo.etapa('x', depende_de=('b',))
+
+
+def test_etapa_duplicada():
+    grafo = GrafoCalculo(entradas=('a',))
+    grafo.etapa('x', depende_de=('a',))(lambda a: a)
+    with pytest.raises(ValueError):
+        grafo.etapa('x', depende_de=('a',))
+    with pytest.raises(ValueError):
+        grafo.etapa('a')
+
+
+def test_faltan_entradas():
+    grafo, _ = grafo_contado()
+    with pytest.raises(ValueError):
+        grafo.evaluar({'a': 1})
+
+
+# --- Grafo real de la aplicación BOMBA 4X3 ---
+
+BASE = {'potencia_hp': 75.0, 'rpm_motor': 1800.0, 'rpm_bomba': 1600.0, 'd_motora': 8.95, 'C_mm': 620.0}
+
+
+def test_cambiar_distancia_entre_centros_no_recalcula_lo_demas(app_bomba_4x3):
+    grafo = app_bomba_4x3.grafo
+    grafo.evaluar(BASE)
+    _, recalculadas = grafo.evaluar({**BASE, 'C_mm': 655.5})
+    assert recalculadas[:2] == ['C_in', 'longitud_calculada']
+    assert not {'d_bomba', 'potencia_diseno', 'grafico'} & set(recalculadas)
+
+
+def calcular_diseno_correa_referencia(potencia_hp, rpm_motor, rpm_bomba, d_motora, C_mm):
+    """Implementación secuencial original, antes del grafo de etapas."""
+    resultados = {}
+    C = C_mm / 25.4
+    resultados['C_in'] = C
+    d_bomba = (rpm_motor / rpm_bomba) * d_motora
+    resultados['d_bomba'] = d_bomba
+    L = 2 * C + 1.57 * (d_bomba + d_motora) + (d_bomba - d_motora)**2 / (4 * C)
+    longitudes_std_5v = [90, 95, 100, 106, 112, 118, 125, 132, 140, 150]
+    longitud_seleccionada = min(longitudes_std_5v, key=lambda x: abs(x - L))
+    resultados['longitud_correa'] = longitud_seleccionada
+    B = 4 * longitud_seleccionada - 6.28 * (d_bomba + d_motora)
+    try:
+        C_real = (B + math.sqrt(B**2 - 32 * (d_bomba - d_motora)**2)) / 16
+    except ValueError:
+        C_real = C
+    resultados['C_real'] = C_real
+    try:
+        theta_rad = math.pi - 2 * math.asin((d_bomba - d_motora) / (2 * C_real))
+        theta_deg = math.degrees(theta_rad)
+    except ValueError:
+        theta_deg = 180.0
+    resultados['angulo_contacto'] = theta_deg
+    potencia_diseno = potencia_hp * 1.4
+    resultados['potencia_diseno'] = potencia_diseno
+    potencia_nominal_correa = 28.5 + 0.85
+    if theta_deg > 175: C_theta = 1.0
+    elif theta_deg > 165: C_theta = 0.98
+    elif theta_deg > 154: C_theta = 0.95
+    elif theta_deg > 140: C_theta = 0.92
+    else: C_theta = 0.88
+    if longitud_seleccionada > 132: C_L = 1.05
+    elif longitud_seleccionada > 106: C_L = 1.0
+    else: C_L = 0.95
+    potencia_corregida_correa = potencia_nominal_correa * C_theta * C_L
+    resultados['potencia_corregida'] = potencia_corregida_correa
+    num_correas_seleccionado = math.ceil(potencia_diseno / potencia_corregida_correa)
+    resultados['num_correas'] = num_correas_seleccionado
+    capacidad_total = num_correas_seleccionado * potencia_corregida_correa
+    resultados['factor_seguridad'] = capacidad_total / potencia_diseno
+    return resultados
+
+
+def test_equivale_a_la_implementacion_secuencial(app_bomba_4x3):
+    aleatorio = random.Random(2024)
+    for _ in range(5000):
+        entradas = (aleatorio.uniform(5, 200), aleatorio.uniform(900, 2000), aleatorio.uniform(900, 2000),
+                    aleatorio.uniform(4, 14), aleatorio.uniform(300, 1200))
+        assert app_bomba_4x3.calcular_diseno_correa(*entradas) == calcular_diseno_correa_referencia(*entradas)
+
+
+def test_el_formulario_usa_el_grafico_del_grafo(app_bomba_4x3, monkeypatch):
+    monkeypatch.setitem(app_bomba_4x3.app.config, 'HISTORIAL_DESACTIVADO', True)
+    llamadas = []
+    monkeypatch.setattr(app_bomba_4x3, 'generar_grafico_bomba', lambda: llamadas.append(1) or 'no-usar')
+    valores, _ = app_bomba_4x3.grafo.evaluar(BASE)
+
+    respuesta = app_bomba_4x3.app.test_client().post('/', data={**BASE, 'C_mm': 700.0})
+    assert respuesta.status_code == 200
+    assert valores['grafico'] in respuesta.get_data(as_text=True)
+    assert llamadas == []
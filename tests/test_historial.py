@@ -0,0 +1,156 @@
+import sqlite3
+import time
+
+import pytest
+
+import historial
+import servidor
+
+
+@pytest.fixture(autouse=True)
+def historial_temporal(tmp_path, monkeypatch):
+    """Cada prueba escribe en su propia base, con su propio hilo de escritura."""
+    monkeypatch.setattr(historial, 'RUTA_DB', str(tmp_path / 'historial.db'))
+    monkeypatch.setattr(historial, '_pid', None)
+    yield
+    historial.vaciar()
+
+
+def registrar_disenos(valores):
+    """Registra un diseño por cada (rpm_bomba, factor_seguridad) y espera a que se escriban."""
+    for rpm_bomba, factor_seguridad in valores:
+        historial.registrar('prueba', {}, {}, hp=75.0, rpm_motor=1800.0, rpm_bomba=rpm_bomba,
+                            factor_seguridad=factor_seguridad)
+    historial.vaciar()
+
+
+def recorrer_paginas(limite, **filtros):
+    disenos, antes_de = [], None
+    while True:
+        pagina = historial.consultar(limite=limite, antes_de=antes_de, **filtros)
+        disenos.extend(pagina['disenos'])
+        antes_de = pagina['siguiente']
+        if antes_de is None:
+            return disenos
+
+
+def test_sin_base_de_datos_no_hay_disenos(tmp_path):
+    assert historial.consultar() == {'disenos': [], 'siguiente': None}
+    # Consultar no crea la base
+    assert not (tmp_path / 'historial.db').exists()
+
+
+def test_consultar_no_escribe_en_la_base():
+    registrar_disenos([(1600.0, 1.1)])
+    conexion = historial._conectar_lectura()
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            conexion.execute('DELETE FROM disenos')
+    finally:
+        conexion.close()
+    assert len(historial.consultar()['disenos']) == 1
+
+
+def test_filtros_desde_la_url():
+    registrar_disenos([(1600.0, 1.1), (1600.0, 1.4), (1500.0, 1.0), (1600.0, 1.2)])
+    respuesta = historial.consultar_desde_args({'rpm_bomba': '1600', 'factor_seguridad_max': '1.2'})
+    assert [d['factor_seguridad'] for d in respuesta['disenos']] == [1.2, 1.1]
+    assert all(d['rpm_bomba'] == 1600.0 for d in respuesta['disenos'])
+
+    respuesta = historial.consultar_desde_args({'factor_seguridad_min': '1.2', 'origen': 'prueba'})
+    assert [d['factor_seguridad'] for d in respuesta['disenos']] == [1.4, 1.2]
+
+
+@pytest.mark.parametrize('args', [
+    {'potencia': '75'},
+    {'rpm_bomba': 'abc'},
+    {'limite': 'diez'},
+    {'hp': 'inf'},
+    {'factor_seguridad_max': 'nan'},
+    {'antes_de': 'abc'},
+    {'antes_de': '-1'},
+    {'antes_de': '99999999999999999999999'},
+    {'factor_seguridad_max': '1.2', 'antes_de': '7'},
+    {'factor_seguridad_max': '1.2', 'antes_de': 'inf,7'},
+])
+def test_argumentos_invalidos(args):
+    with pytest.raises(ValueError):
+        historial.consultar_desde_args(args)
+
+
+def test_paginacion_por_id():
+    registrar_disenos([(1600.0, 1.0 + i / 10) for i in range(7)])
+    paginas = [historial.consultar(limite=3)]
+    while paginas[-1]['siguiente'] is not None:
+        paginas.append(historial.consultar(limite=3, antes_de=paginas[-1]['siguiente']))
+
+    assert [len(p['disenos']) for p in paginas] == [3, 3, 1]
+    ids = [d['id'] for p in paginas for d in p['disenos']]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 7
+
+
+def test_paginacion_con_filtro_de_rango_sin_saltos_ni_repetidos():
+    # Valores repetidos del campo de orden: el cursor (campo, id) los separa
+    valores = [(1600.0, fs) for fs in (1.3, 1.1, 1.2, 1.1, 1.3, 0.9, 1.1, 1.2)] + [(1500.0, 1.1)]
+    registrar_disenos(valores)
+
+    disenos = recorrer_paginas(2, rpm_bomba=1600.0, factor_seguridad_max=1.2)
+    claves = [(d['factor_seguridad'], d['id']) for d in disenos]
+    assert claves == sorted(claves, reverse=True)
+    assert [fs for fs, _ in claves] == [1.2, 1.2, 1.1, 1.1, 1.1, 0.9]
+    assert len({id_ for _, id_ in claves}) == len(claves)
+
+
+def test_la_ruta_responde_400_ante_desbordamiento(app_raiz):
+    respuesta = app_raiz.app.test_client().get('/historial', query_string={'antes_de': '9' * 23})
+    assert respuesta.status_code == 400
+    assert 'error' in respuesta.get_json()
+
+
+def test_el_precalentamiento_no_se_guarda_en_el_historial(app_raiz):
+    servidor.precalentar_aplicacion(app_raiz.app)
+    historial.vaciar()
+    assert historial.consultar()['disenos'] == []
+    assert not app_raiz.app.config.get('HISTORIAL_DESACTIVADO')
+
+    # Las peticiones normales sí se registran
+    ruta, datos = app_raiz.PETICION_EJEMPLO
+    app_raiz.app.test_client().post(ruta, data=datos)
+    historial.vaciar()
+    disenos = historial.consultar()['disenos']
+    assert [d['origen'] for d in disenos] == ['raiz']
+
+
+def test_sin_acceso_a_la_base_vaciar_no_espera(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(historial, 'RUTA_DB', str(tmp_path / 'no_existe' / 'historial.db'))
+    historial.registrar('prueba', {}, {}, hp=75.0)
+    assert historial._sin_base.wait(timeout=5)
+    inicio = time.monotonic()
+    historial.vaciar()
+    assert time.monotonic() - inicio < 1
+    assert 'no se pudo abrir' in capsys.readouterr().err
+
+
+def test_el_hilo_de_escritura_reintenta_hasta_abrir_la_base(tmp_path, monkeypatch):
+    carpeta = tmp_path / 'aun_no_existe'
+    monkeypatch.setattr(historial, 'RUTA_DB', str(carpeta / 'historial.db'))
+    monkeypatch.setattr(historial, 'REINTENTO_MIN', 0.01)
+    historial.registrar('prueba', {}, {}, hp=75.0)
+    assert historial._sin_base.wait(timeout=5)
+    carpeta.mkdir()
+    limite = time.monotonic() + 5
+    while not historial.consultar()['disenos'] and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert len(historial.consultar()['disenos']) == 1
+
+
+def test_los_descartados_se_informan(monkeypatch, capsys):
+    monkeypatch.setattr(historial, 'MAX_PENDIENTES', 1)
+    monkeypatch.setattr(historial, 'descartados', 0)
+    monkeypatch.setattr(historial, '_descartados_informados', 0)
+    for _ in range(50):
+        historial.registrar('prueba', {}, {}, hp=75.0)
+    historial.vaciar()
+    assert historial.descartados > 0
+    assert f'({historial.descartados} en total)' in capsys.readouterr().err
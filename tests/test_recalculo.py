@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+BASE = {'potencia_hp': '75', 'rpm_motor': '1800', 'rpm_bomba': '1600', 'd_motora': '8.95', 'C_mm': '620'}
+SIN_RESULTADO = b'event: invalido\ndata: {}\n\n'
+
+
+def leer_evento(respuesta):
+    evento, datos = respuesta.get_data(as_text=True).strip().split('\n')
+    return evento.removeprefix('event: '), datos.removeprefix('data: ')
+
+
+@pytest.mark.parametrize('campo, valor', [
+    ('potencia_hp', 'inf'),
+    ('potencia_hp', '1e309'),
+    ('C_mm', 'nan'),
+    ('C_mm', '-5'),
+    ('rpm_bomba', '0'),
+    ('d_motora', ''),
+    ('rpm_motor', 'abc'),
+])
+def test_entradas_invalidas_devuelven_evento_invalido(app_bomba_4x3, campo, valor):
+    respuesta = app_bomba_4x3.app.test_client().get('/recalculo', query_string={**BASE, campo: valor})
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'text/event-stream'
+    assert respuesta.data == SIN_RESULTADO
+
+
+def test_entrada_faltante_devuelve_evento_invalido(app_bomba_4x3):
+    parametros = {k: v for k, v in BASE.items() if k != 'C_mm'}
+    respuesta = app_bomba_4x3.app.test_client().get('/recalculo', query_string=parametros)
+    assert respuesta.data == SIN_RESULTADO
+
+
+def test_resultado_es_json_estricto(app_bomba_4x3):
+    respuesta = app_bomba_4x3.app.test_client().get('/recalculo', query_string={**BASE, 'con_grafico': '1'})
+    evento, datos = leer_evento(respuesta)
+    assert evento == 'resultado'
+
+    def rechazar(constante):
+        raise ValueError(constante)
+    datos = json.loads(datos, parse_constant=rechazar)
+    assert datos['resultados']['num_correas'] == 4
+    assert datos['plot_url']
+
+
+def test_el_grafico_solo_se_envia_cuando_hace_falta(app_bomba_4x3):
+    cliente = app_bomba_4x3.app.test_client()
+    cliente.get('/recalculo', query_string=BASE)
+    _, datos = leer_evento(cliente.get('/recalculo', query_string={**BASE, 'C_mm': '640'}))
+    datos = json.loads(datos)
+    assert 'plot_url' not in datos
+    assert 'grafico' not in datos['recalculadas']